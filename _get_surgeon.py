@@ -0,0 +1,13 @@
+"""
+Shared BugSurgeon factory for the helper scripts
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_surgeon():
+    """Build the BugSurgeon once per process and hand back the same instance"""
+    # Environment is read on the first call only; a failed construction is not cached
+    from debug_orchestrator import BugSurgeon
+    return BugSurgeon()
@@ -0,0 +1,13 @@
+"""
+Shared Anthropic client for the helper scripts
+"""
+
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_anthropic():
+    """Build the Anthropic client once so its connection pool is reused"""
+    from anthropic import Anthropic
+    return Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
@@ -5,24 +5,30 @@ Integrates with GitHub Actions to provide AI-powered debugging assistance
 """
 
 import os
+import io
+import asyncio
+import hashlib
+import itertools
 import json
 import re
 import sys
+import time
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
-# Third-party imports
+# Optional faster JSON codec; stdlib json is used when it isn't installed
 try:
-    from anthropic import Anthropic
-    from github import Github
-    from github.Repository import Repository
+    import orjson
+except ImportError:
+    orjson = None
+
+# Third-party imports are deferred to the code paths that need them, so that
+# importing this module (e.g. for load_env_file) stays cheap
+if TYPE_CHECKING:
     from github.Issue import Issue
-except ImportError as e:
-    print(f"Missing required dependencies: {e}")
-    print("Install with: pip install anthropic PyGithub")
-    sys.exit(1)
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +37,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns for issue text and Claude responses
+_FILE_PATH_RE = re.compile(
+    r'File "([^"]+\.py)"'  # File "path/to/file.py"
+    r'|in ([a-zA-Z_][a-zA-Z0-9_/]*\.py)'  # in auth.py
+    r'|([a-zA-Z_][a-zA-Z0-9_/]*\.py)'  # direct mention like auth.py
+)
+_BLOCK_RE = re.compile(r'<(?P<tag>analysis|solution|thinking)>(?P<body>.*?)</(?P=tag)>', re.DOTALL)
+_ANALYSIS_FIELD_RE = re.compile(r'^[ \t]*(ROOT_CAUSE|EXPLANATION|CONFIDENCE):[ \t]*(.*?)[ \t\r]*$', re.MULTILINE)
+_THINKING_RE = re.compile(r'<thinking>(.*?)</thinking>', re.DOTALL)
+# A TOOL_REQUEST line followed by its FILE/START_LINE/END_LINE lines, in any order
+_TOOL_REQ_RE = re.compile(
+    r'^[ \t]*TOOL_REQUEST:[ \t]*(\S*)[^\n]*$'
+    r'((?:\s*^[ \t]*(?:FILE|START_LINE|END_LINE):[^\n]*$)*)',
+    re.MULTILINE
+)
+_TOOL_FIELD_RE = re.compile(r'^[ \t]*(FILE|START_LINE|END_LINE):[ \t]*([^\n]*?)[ \t\r]*$', re.MULTILINE)
+# KEY=value lines of a .env file; values may be quoted or carry a " # comment".
+# env_loader._ENV_RE is the same pattern for the helper scripts; keep them in sync.
+_ENV_RE = re.compile(
+    rb'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    rb'(?:"([^"\n]*)"|\'([^\'\n]*)\'|([^\n]*?))'
+    rb'[ \t\r]*(?:[ \t]#[^\n]*)?$',
+    re.MULTILINE
+)
+_BLANK_LINE_RE = re.compile(r'[ \t\r]*\n[ \t\r]*\n')
+_TOOL_REQ_PREFIX = 'TOOL_REQUEST:'
+
 
 @dataclass
 class BugAnalysis:
@@ -55,12 +88,12 @@ def load_env_file():
     """Load environment variables from .env file"""
     env_path = Path('.env')
     if env_path.exists():
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip().strip('"').strip("'")
+        # Scan the raw bytes; only the matched keys and values get decoded
+        parsed = {}
+        for match in _ENV_RE.finditer(env_path.read_bytes()):
+            key, double_quoted, single_quoted, bare = match.groups()
+            parsed[key.decode('utf-8')] = (double_quoted or single_quoted or bare or b'').decode('utf-8')
+        os.environ.update(parsed)
         logger.info("Loaded environment variables from .env file")
     else:
         logger.warning("No .env file found")
@@ -120,6 +153,13 @@ Provide the corrected code with clear explanations
         "claude-3-haiku-20240307"  # Fast fallback
     ]
 
+    # Where the last working model is remembered between runs, and for how long
+    MODEL_CACHE_PATH = Path.home() / '.cache' / 'bug_surgeon' / 'model.json'
+    MODEL_CACHE_TTL = 24 * 60 * 60
+
+    # Seconds between status checks while a message batch is processing
+    BATCH_POLL_INTERVAL = 30
+
     def __init__(self):
         """Initialize the Bug Surgeon with API clients"""
         # Initialize Anthropic client
@@ -128,11 +168,21 @@ Provide the corrected code with clear explanations
             raise ValueError("ANTHROPIC_API_KEY environment variable required")
 
         try:
-            # Try with explicit parameters to avoid proxy issues
+            from anthropic import Anthropic, Timeout
+        except ImportError as e:
+            raise ImportError(f"Missing required dependencies: {e}. "
+                              "Install with: pip install anthropic PyGithub") from e
+
+        # Fail fast on connect/pool waits, but give generation time to finish
+        timeout = Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0)
+
+        try:
+            # Try with explicit parameters to avoid proxy issues. The client (and
+            # its pooled keep-alive connections) is reused for every call below.
             self.claude = Anthropic(
                 api_key=api_key,
                 max_retries=3,
-                timeout=60.0
+                timeout=timeout
             )
             logger.info("Anthropic client initialized successfully")
         except TypeError as e:
@@ -152,18 +202,26 @@ Provide the corrected code with clear explanations
         # Test which model works
         self.working_model = self._find_working_model()
 
-        # Initialize GitHub client (make it optional for local testing)
-        github_token = os.getenv('GITHUB_TOKEN')
-        if github_token and github_token != 'dummy_token_for_local_test':
+        # Initialize GitHub clients (make them optional for local testing). A
+        # comma-separated GITHUB_TOKENS spreads requests over several rate limits;
+        # an empty GITHUB_TOKENS (e.g. an unset workflow secret) falls back too.
+        github_tokens = [
+            token.strip()
+            for token in (os.getenv('GITHUB_TOKENS') or os.getenv('GITHUB_TOKEN', '')).split(',')
+            if token.strip() and token.strip() != 'dummy_token_for_local_test'
+        ]
+        self._github_pool = []
+        if github_tokens:
             try:
-                self.github = Github(github_token)
-                logger.info("GitHub client initialized successfully")
+                from github import Github
+                self._github_pool = [Github(token, per_page=100, retry=3) for token in github_tokens]
+                logger.info(f"GitHub client initialized successfully ({len(self._github_pool)} token(s))")
             except Exception as e:
                 logger.warning(f"GitHub initialization failed: {e}")
-                self.github = None
+                self._github_pool = []
         else:
             logger.info("GitHub token not provided - running in local mode")
-            self.github = None
+        self.github = self._github_pool[0] if self._github_pool else None
 
         # Get repository context (optional)
         repo_name = os.getenv('GITHUB_REPOSITORY')
@@ -181,35 +239,147 @@ Provide the corrected code with clear explanations
             else:
                 logger.info("GitHub client not available - running in local mode")
 
+        # Repository handle per pooled token, fetched the first time it is used
+        self._repo_handles = {0: self.repo}
+        self._gh_rr = itertools.cycle(range(len(self._github_pool) or 1))
+
+        # Successful file reads, keyed by (path, start_line, end_line), so repeated
+        # requests for the same file don't hit the GitHub API or disk again
+        self._file_cache: Dict[Tuple[str, Optional[int], Optional[int]], str] = {}
+
+        # Analyses currently running via analyze_bug_async, keyed by issue fingerprint
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _next_repo(self):
+        """Repository handle for the next token in the pool (round-robin)"""
+        index = next(self._gh_rr)
+        if index not in self._repo_handles:
+            self._repo_handles[index] = self._github_pool[index].get_repo(self.repo.full_name)
+        return self._repo_handles[index]
+
     def _find_working_model(self) -> str:
-        """Find a working Claude model"""
-        for model in self.AVAILABLE_MODELS:
-            try:
-                # Test the model with a simple call
-                response = self.claude.messages.create(
-                    model=model,
-                    max_tokens=10,
-                    system="You are helpful.",
-                    messages=[{"role": "user", "content": "Hi"}]
-                )
+        """Find a working Claude model, reusing a recently cached result"""
+        cached_model = self._load_cached_model()
+        if cached_model:
+            logger.info(f"Using cached model: {cached_model}")
+            return cached_model
+
+        available = self._list_available_models()
+        if available is not None:
+            model = next((m for m in self.AVAILABLE_MODELS if m in available), None)
+            if model:
                 logger.info(f"Using model: {model}")
-                return model
-            except Exception as e:
-                logger.warning(f"Model {model} not available: {e}")
-                continue
+        else:
+            # Listing is unavailable - fall back to probing each model
+            model = self._probe_models()
+
+        if not model:
+            # If no models work, default to the first one and let it fail gracefully
+            logger.error("No working models found, using default")
+            return self.AVAILABLE_MODELS[0]
 
-        # If no models work, default to the first one and let it fail gracefully
-        logger.error("No working models found, using default")
-        return self.AVAILABLE_MODELS[0]
+        self._save_cached_model(model)
+        return model
+
+    def _list_available_models(self) -> Optional[set]:
+        """IDs of the models this API key can use, or None if listing fails"""
+        try:
+            # Iterating the page follows pagination; no tokens are billed
+            return {model.id for model in self.claude.models.list(limit=50)}
+        except Exception as e:
+            logger.warning(f"Could not list available models: {e}")
+            return None
+
+    def _load_cached_model(self) -> Optional[str]:
+        """Return the cached working model if it is still fresh"""
+        try:
+            data = self.MODEL_CACHE_PATH.read_bytes()
+            cached = orjson.loads(data) if orjson else json.loads(data)
+            model = cached["model"]
+            age = time.time() - float(cached["ts"])
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.debug(f"No usable model cache: {e}")
+            return None
+
+        if model in self.AVAILABLE_MODELS and 0 <= age < self.MODEL_CACHE_TTL:
+            return model
+        return None
+
+    def _save_cached_model(self, model: str):
+        """Remember the working model so later runs can skip probing"""
+        cached = {"model": model, "ts": time.time()}
+        data = orjson.dumps(cached) if orjson else json.dumps(cached).encode('utf-8')
+        try:
+            self.MODEL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            self.MODEL_CACHE_PATH.write_bytes(data)
+        except OSError as e:
+            logger.warning(f"Could not write model cache: {e}")
+
+    def _probe(self, model: str) -> str:
+        """Send a minimal request to check that a model is available"""
+        self.claude.messages.create(
+            model=model,
+            max_tokens=1,
+            system="You are helpful.",
+            messages=[{"role": "user", "content": "Hi"}]
+        )
+        return model
+
+    def _probe_models(self) -> Optional[str]:
+        """Probe all models concurrently and return the most preferred working one"""
+        # Worker threads rather than asyncio.run, so this also works when the
+        # caller already has an event loop running (Jupyter, async handlers)
+        executor = ThreadPoolExecutor(max_workers=len(self.AVAILABLE_MODELS))
+        tasks = {executor.submit(self._probe, model): model for model in self.AVAILABLE_MODELS}
+        pending = set(tasks)
+        available: Dict[str, bool] = {}
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for task in done:
+                    model = tasks[task]
+                    error = task.exception()
+                    available[model] = error is None
+                    if error is not None:
+                        logger.warning(f"Model {model} not available: {error}")
+
+                # Stop as soon as no more preferred model is still being probed
+                for model in self.AVAILABLE_MODELS:
+                    if model not in available:
+                        break
+                    if available[model]:
+                        logger.info(f"Using model: {model}")
+                        return model
+        finally:
+            # Don't wait on probes whose answer no longer matters
+            executor.shutdown(wait=False)
+
+        return None
+
+    def _system_prompt_blocks(self) -> List[Dict]:
+        """Expert system prompt marked as a prompt-cache breakpoint"""
+        # Repeat calls within the cache TTL bill these tokens at cached-read rates
+        return [{
+            "type": "text",
+            "text": self.EXPERT_SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"}
+        }]
 
     def read_file_content(self, file_path: str, start_line: Optional[int] = None,
                           end_line: Optional[int] = None) -> str:
         """Read file content from repository or local filesystem"""
+        cache_key = (file_path, start_line, end_line)
+        cached = self._file_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Using cached content for {file_path}")
+            return cached
+
         try:
             if self.repo:
                 # GitHub Actions mode - read from repository
                 try:
-                    file_content = self.repo.get_contents(file_path)
+                    file_content = self._next_repo().get_contents(file_path)
                     content = file_content.decoded_content.decode('utf-8')
                 except Exception as e:
                     logger.error(f"Failed to read {file_path} from repo: {e}")
@@ -223,22 +393,26 @@ Provide the corrected code with clear explanations
 
             # Extract specific lines if requested
             if start_line or end_line:
-                lines = content.split('\n')
                 start = (start_line - 1) if start_line else 0
-                end = end_line if end_line else len(lines)
-                content = '\n'.join(lines[start:end])
-                return f"# {file_path} lines {start + 1}-{end}\n{content}"
+                # Only split lines up to end_line rather than the whole file
+                selected = list(itertools.islice(io.StringIO(content), start, end_line))
+                end = end_line if end_line else start + len(selected)
+                content = ''.join(selected)
+                if content.endswith('\n'):
+                    content = content[:-1]
+                result = f"# {file_path} lines {start + 1}-{end}\n{content}"
+            else:
+                result = f"# {file_path}\n{content}"
 
-            return f"# {file_path}\n{content}"
+            self._file_cache[cache_key] = result
+            return result
 
         except Exception as e:
             logger.error(f"Error reading file {file_path}: {e}")
             return f"Error reading file: {e}"
 
-    def analyze_bug_direct(self, issue_description: str, file_paths: List[str] = None) -> Optional[BugAnalysis]:
-        """Direct analysis method - provides file content upfront to avoid ReAct loops"""
-        logger.info("Starting direct bug analysis...")
-
+    def _build_direct_prompt(self, issue_description: str, file_paths: List[str] = None) -> str:
+        """Build the single-shot analysis prompt, inlining any readable files"""
         # Build comprehensive prompt with file contents if provided
         comprehensive_prompt = f"""
 {issue_description}
@@ -249,8 +423,10 @@ Please analyze this systematically and identify the root cause.
         # Add file contents if file paths are provided
         if file_paths:
             comprehensive_prompt += "\n\nRelevant file contents:\n"
-            for file_path in file_paths:
-                file_content = self.read_file_content(file_path)
+            # Overlap the reads on worker threads; map keeps file_paths order
+            with ThreadPoolExecutor() as executor:
+                file_contents = list(executor.map(self.read_file_content, file_paths))
+            for file_path, file_content in zip(file_paths, file_contents):
                 if "Error reading file" not in file_content:
                     comprehensive_prompt += f"\n```python\n{file_content}\n```\n"
                     logger.info(f"Added content for {file_path}")
@@ -269,12 +445,19 @@ CONFIDENCE: HIGH/MEDIUM/LOW based on available evidence
 Provide the corrected code with clear explanations
 </solution>
 """
+        return comprehensive_prompt
+
+    def analyze_bug_direct(self, issue_description: str, file_paths: List[str] = None) -> Optional[BugAnalysis]:
+        """Direct analysis method - provides file content upfront to avoid ReAct loops"""
+        logger.info("Starting direct bug analysis...")
+
+        comprehensive_prompt = self._build_direct_prompt(issue_description, file_paths)
 
         try:
             response = self.claude.messages.create(
                 model=self.working_model,
                 max_tokens=4096,
-                system=self.EXPERT_SYSTEM_PROMPT,
+                system=self._system_prompt_blocks(),
                 messages=[
                     {"role": "user", "content": comprehensive_prompt}
                 ],
@@ -299,84 +482,110 @@ Provide the corrected code with clear explanations
             logger.error(f"Error in direct analysis: {e}")
             return None
 
-    def parse_tool_requests(self, response_text: str) -> List[ToolRequest]:
-        """Parse tool requests from Claude's response"""
-        tool_requests = []
-        lines = response_text.split('\n')
+    def analyze_bugs_batch(self, issues: List[Tuple[int, str, List[str]]]) -> Dict[int, Optional[BugAnalysis]]:
+        """Analyze many issues at once via the Message Batches API (half token price, not interactive)
+
+        Each entry is (issue_number, issue_description, file_paths). Returns the
+        analysis per issue number, or None for issues whose request failed.
+        """
+        logger.info(f"Starting batch analysis of {len(issues)} issues...")
+        results: Dict[int, Optional[BugAnalysis]] = {number: None for number, _, _ in issues}
+
+        requests = [
+            {
+                "custom_id": f"issue-{number}",
+                "params": {
+                    "model": self.working_model,
+                    "max_tokens": 4096,
+                    "system": self._system_prompt_blocks(),
+                    "messages": [
+                        {"role": "user", "content": self._build_direct_prompt(issue_description, file_paths)}
+                    ],
+                    "temperature": 0.1
+                }
+            }
+            for number, issue_description, file_paths in issues
+        ]
 
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('TOOL_REQUEST:'):
-                try:
-                    tool_type = line.split(':', 1)[1].strip()
-                    file_path = None
-                    start_line = None
-                    end_line = None
-
-                    # Look for file path in next few lines
-                    for j in range(i + 1, min(i + 5, len(lines))):
-                        next_line = lines[j].strip()
-                        if next_line.startswith('FILE:'):
-                            file_path = next_line.split(':', 1)[1].strip()
-                        elif next_line.startswith('START_LINE:'):
-                            try:
-                                start_line = int(next_line.split(':', 1)[1].strip())
-                            except ValueError:
-                                pass
-                        elif next_line.startswith('END_LINE:'):
-                            try:
-                                end_line = int(next_line.split(':', 1)[1].strip())
-                            except ValueError:
-                                pass
-
-                    if file_path:
-                        tool_requests.append(ToolRequest(
-                            tool=tool_type,
-                            file_path=file_path,
-                            start_line=start_line,
-                            end_line=end_line
-                        ))
+        try:
+            batch = self.claude.messages.batches.create(requests=requests)
+            logger.info(f"Submitted message batch {batch.id}")
+
+            while batch.processing_status != "ended":
+                time.sleep(self.BATCH_POLL_INTERVAL)
+                batch = self.claude.messages.batches.retrieve(batch.id)
+                logger.info(f"Batch {batch.id} status: {batch.processing_status}")
+
+            for entry in self.claude.messages.batches.results(batch.id):
+                number = int(entry.custom_id.rsplit('-', 1)[1])
+                if entry.result.type != "succeeded":
+                    logger.error(f"Batch request for issue #{number} {entry.result.type}")
+                    continue
 
-                except Exception as e:
-                    logger.error(f"Error parsing tool request: {e}")
+                response_text = entry.result.message.content[0].text
+                analysis = self.extract_analysis(response_text) or self._create_fallback_analysis(response_text)
+                analysis.reasoning_trace = [f"Batch analysis: {response_text[:200]}..."]
+                results[number] = analysis
 
-            i += 1
+            logger.info("Batch bug analysis completed")
+
+        except Exception as e:
+            logger.error(f"Error in batch analysis: {e}")
+
+        return results
+
+    def parse_tool_requests(self, response_text: str) -> List[ToolRequest]:
+        """Parse tool requests from Claude's response"""
+        requests = (self._tool_request_from_match(match) for match in _TOOL_REQ_RE.finditer(response_text))
+        return [request for request in requests if request]
+
+    @staticmethod
+    def _tool_request_from_match(match) -> Optional[ToolRequest]:
+        """Build a ToolRequest from a _TOOL_REQ_RE match, or None if it names no file"""
+        # Fields may come in any order; a repeated field keeps its last value
+        fields = dict(_TOOL_FIELD_RE.findall(match.group(2)))
+        if not fields.get('FILE'):
+            return None
 
-        return tool_requests
+        def line_number(key: str) -> Optional[int]:
+            try:
+                return int(fields[key])
+            except (KeyError, ValueError):
+                return None
+
+        return ToolRequest(
+            tool=match.group(1),
+            file_path=fields['FILE'],
+            start_line=line_number('START_LINE'),
+            end_line=line_number('END_LINE')
+        )
 
     def extract_analysis(self, response_text: str) -> Optional[BugAnalysis]:
         """Extract structured analysis from Claude's response"""
         try:
-            # Extract analysis block
-            analysis_match = re.search(r'<analysis>(.*?)</analysis>', response_text, re.DOTALL)
-            if not analysis_match:
+            # Pick out the analysis, solution and thinking blocks in a single scan
+            analysis_text = None
+            solution_text = None
+            reasoning_trace = []
+            for match in _BLOCK_RE.finditer(response_text):
+                tag = match.group('tag')
+                if tag == 'thinking':
+                    reasoning_trace.append(match.group('body').strip())
+                elif tag == 'analysis' and analysis_text is None:
+                    analysis_text = match.group('body')
+                elif tag == 'solution' and solution_text is None:
+                    solution_text = match.group('body')
+
+            if analysis_text is None:
                 logger.warning("No analysis block found in response")
                 return self._create_fallback_analysis(response_text)
 
-            analysis_text = analysis_match.group(1)
-
-            # Parse analysis components
-            root_cause = ""
-            explanation = ""
-            confidence = "MEDIUM"
-
-            for line in analysis_text.split('\n'):
-                line = line.strip()
-                if line.startswith('ROOT_CAUSE:'):
-                    root_cause = line.split(':', 1)[1].strip()
-                elif line.startswith('EXPLANATION:'):
-                    explanation = line.split(':', 1)[1].strip()
-                elif line.startswith('CONFIDENCE:'):
-                    confidence = line.split(':', 1)[1].strip()
-
-            # Extract solution block
-            solution_match = re.search(r'<solution>(.*?)</solution>', response_text, re.DOTALL)
-            solution_text = solution_match.group(1) if solution_match else ""
-
-            # Extract thinking traces
-            thinking_matches = re.findall(r'<thinking>(.*?)</thinking>', response_text, re.DOTALL)
-            reasoning_trace = [match.strip() for match in thinking_matches]
+            # Parse analysis components (a repeated field keeps its last value)
+            fields = dict(_ANALYSIS_FIELD_RE.findall(analysis_text))
+            root_cause = fields.get('ROOT_CAUSE', "")
+            explanation = fields.get('EXPLANATION', "")
+            confidence = fields.get('CONFIDENCE', "MEDIUM")
+            solution_text = solution_text or ""
 
             return BugAnalysis(
                 root_cause=root_cause or "Analysis completed",
@@ -393,7 +602,7 @@ Provide the corrected code with clear explanations
     def _create_fallback_analysis(self, response_text: str) -> BugAnalysis:
         """Create a fallback analysis when structured extraction fails"""
         # Try to extract thinking content
-        thinking_matches = re.findall(r'<thinking>(.*?)</thinking>', response_text, re.DOTALL)
+        thinking_matches = _THINKING_RE.findall(response_text)
         reasoning_trace = [match.strip() for match in thinking_matches]
 
         # Extract first few sentences as root cause
@@ -424,35 +633,78 @@ Provide the corrected code with clear explanations
         logger.info("No specific files found, trying ReAct approach")
         return self._analyze_bug_react(issue_description, max_iterations)
 
-    def _extract_file_paths(self, issue_description: str) -> List[str]:
-        """Extract file paths mentioned in issue description"""
-        # Look for common file path patterns
-        import re
-        file_patterns = [
-            r'File "([^"]+\.py)"',  # File "path/to/file.py"
-            r'in ([a-zA-Z_][a-zA-Z0-9_/]*\.py)',  # in auth.py
-            r'([a-zA-Z_][a-zA-Z0-9_/]*\.py)',  # direct mention like auth.py
-        ]
+    async def analyze_bug_async(self, issue_description: str, max_iterations: int = 3) -> Optional[BugAnalysis]:
+        """Async analyze_bug; concurrent calls for an identical issue share a single analysis"""
+        files = self._extract_file_paths(issue_description)
+        key = hashlib.sha256((issue_description + "|".join(sorted(files))).encode()).hexdigest()
 
-        files = []
-        for pattern in file_patterns:
-            matches = re.findall(pattern, issue_description)
-            files.extend(matches)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.info("Identical analysis already in progress, waiting for its result")
+            return await asyncio.shield(inflight)
 
-        # Filter to files that actually exist
-        existing_files = []
-        for file_path in files:
-            if Path(file_path).exists():
-                existing_files.append(file_path)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, self.analyze_bug, issue_description, max_iterations)
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
 
-        return existing_files
+        # Shielded so one caller being cancelled doesn't cancel it for the others
+        return await asyncio.shield(future)
+
+    def _extract_file_paths(self, issue_description: str) -> List[str]:
+        """Extract file paths mentioned in issue description"""
+        # One pass over the text; each match fills exactly one alternative
+        files = {match.group(1) or match.group(2) or match.group(3)
+                 for match in _FILE_PATH_RE.finditer(issue_description)}
+
+        # Filter to files that actually exist, checking each unique path once
+        return sorted(file_path for file_path in files if Path(file_path).exists())
+
+    def _stream_react_turn(self, messages: List[Dict]) -> str:
+        """Stream one ReAct turn, stopping as soon as its tool requests are complete"""
+        response_text = ""
+        seen_request = False
+
+        with self.claude.messages.stream(
+            model=self.working_model,
+            max_tokens=4096,
+            system=self._system_prompt_blocks(),
+            messages=messages,
+            temperature=0.1
+        ) as stream:
+            for text in stream.text_stream:
+                response_text += text
+                # Only the tail can contain a newly arrived sentinel
+                if not seen_request:
+                    seen_request = _TOOL_REQ_PREFIX in response_text[-(len(text) + len(_TOOL_REQ_PREFIX)):]
+                if seen_request and self._tool_requests_complete(response_text):
+                    # Leaving the context closes the connection and ends generation
+                    logger.info("Tool request received, stopping generation early")
+                    break
+
+        return response_text
+
+    def _tool_requests_complete(self, response_text: str) -> bool:
+        """True once a full tool request is followed by a blank line and unrelated text"""
+        last_match = None
+        for last_match in _TOOL_REQ_RE.finditer(response_text):
+            pass
+        if last_match is None or not self._tool_request_from_match(last_match):
+            return False
+
+        rest = response_text[last_match.end():]
+        blank_line = _BLANK_LINE_RE.match(rest)
+        if not blank_line:
+            return False
+
+        # Keep reading while the next text could still be another TOOL_REQUEST
+        following = rest[blank_line.end():].lstrip()
+        return bool(following) and not _TOOL_REQ_PREFIX.startswith(following[:len(_TOOL_REQ_PREFIX)])
 
     def _analyze_bug_react(self, issue_description: str, max_iterations: int = 3) -> Optional[BugAnalysis]:
         """ReAct analysis method (with improved loop handling)"""
-        messages = [
-            {"role": "user",
-             "content": f"Please analyze this bug report and identify the root cause:\n\n{issue_description}"}
-        ]
+        issue_prompt = f"Please analyze this bug report and identify the root cause:\n\n{issue_description}"
+        messages = [{"role": "user", "content": issue_prompt}]
 
         iteration = 0
         reasoning_trace = []
@@ -462,26 +714,16 @@ Provide the corrected code with clear explanations
             try:
                 logger.info(f"ReAct iteration {iteration + 1}")
 
-                response = self.claude.messages.create(
-                    model=self.working_model,
-                    max_tokens=4096,
-                    system=self.EXPERT_SYSTEM_PROMPT,
-                    messages=messages,
-                    temperature=0.1
-                )
-
-                response_text = response.content[0].text
+                response_text = self._stream_react_turn(messages)
                 reasoning_trace.append(f"Iteration {iteration + 1}: {response_text[:200]}...")
 
                 # Check for tool requests
                 tool_requests = self.parse_tool_requests(response_text)
 
                 if tool_requests:
-                    # Add Claude's response to conversation
-                    messages.append({"role": "assistant", "content": response_text})
-
                     # Process tool requests (but avoid duplicate requests)
-                    new_files_added = False
+                    tool_results = []
+                    round_files = set()
                     for tool_request in tool_requests:
                         if tool_request.tool == "read_file" and tool_request.file_path:
                             if tool_request.file_path not in requested_files:
@@ -490,23 +732,35 @@ Provide the corrected code with clear explanations
                                     tool_request.start_line,
                                     tool_request.end_line
                                 )
-                                messages.append({
+                                tool_results.append({
                                     "role": "user",
                                     "content": f"File content for {tool_request.file_path}:\n{file_content}\n\nNow please provide your final analysis with <analysis> and <solution> blocks."
                                 })
                                 requested_files.add(tool_request.file_path)
-                                new_files_added = True
+                                round_files.add(tool_request.file_path)
                                 logger.info(f"Provided content for {tool_request.file_path}")
                             else:
                                 logger.warning(f"File {tool_request.file_path} already requested, skipping")
 
-                    if not new_files_added:
+                    if not round_files:
                         # No new files to add, force final analysis
-                        messages.append({
+                        tool_results.append({
                             "role": "user",
                             "content": "Please provide your final analysis now with <analysis> and <solution> blocks."
                         })
 
+                    # Resend only the latest exchange; earlier rounds are summarized
+                    # so tokens per iteration stay flat instead of accumulating
+                    opening = issue_prompt
+                    prior_files = sorted(requested_files - round_files)
+                    if prior_files:
+                        opening += f"\n\nPrior files examined: {prior_files}"
+                    messages = [
+                        {"role": "user", "content": opening},
+                        {"role": "assistant", "content": response_text},
+                        *tool_results
+                    ]
+
                     iteration += 1
                     continue
 
@@ -525,19 +779,23 @@ Provide the corrected code with clear explanations
         logger.warning("ReAct max iterations reached, creating fallback analysis")
         return self._create_fallback_analysis("Analysis attempted but max iterations reached")
 
-    def create_analysis_pr(self, issue: Issue, analysis: BugAnalysis) -> Optional[str]:
+    def create_analysis_pr(self, issue: "Issue", analysis: BugAnalysis) -> Optional[str]:
         """Create a pull request with the bug fix"""
         if not self.repo:
             logger.warning("No repository configured - cannot create PR")
             return None
 
         try:
+            # Keep every write for this PR on the same token; the first use of a
+            # pooled token fetches its repo handle, which can fail too
+            repo = self._next_repo()
+
             # Create new branch
-            main_ref = self.repo.get_git_ref('heads/main')
+            main_ref = repo.get_git_ref('heads/main')
             new_branch = f"bug-surgeon/fix-issue-{issue.number}"
 
             try:
-                self.repo.create_git_ref(
+                repo.create_git_ref(
                     ref=f'refs/heads/{new_branch}',
                     sha=main_ref.object.sha
                 )
@@ -548,7 +806,7 @@ Provide the corrected code with clear explanations
                     raise
 
             # Create analysis file
-            analysis_content = f"""# Bug Analysis Report - Issue #{issue.number}
+            parts = [f"""# Bug Analysis Report - Issue #{issue.number}
 
 ## Root Cause
 {analysis.root_cause}
@@ -560,14 +818,13 @@ Provide the corrected code with clear explanations
 {analysis.confidence}
 
 ## Reasoning Trace
-"""
-
-            for i, trace in enumerate(analysis.reasoning_trace, 1):
-                analysis_content += f"\n### Step {i}\n{trace}\n"
+"""]
+            parts.extend(f"\n### Step {i}\n{trace}\n" for i, trace in enumerate(analysis.reasoning_trace, 1))
+            analysis_content = "".join(parts)
 
             # Commit analysis file
             try:
-                self.repo.create_file(
+                repo.create_file(
                     path=f"bug-analysis-{issue.number}.md",
                     message=f"🤖 Bug analysis for issue #{issue.number}",
                     content=analysis_content,
@@ -592,7 +849,7 @@ Provide the corrected code with clear explanations
 *Review the analysis and apply fixes as appropriate*
 """
 
-            pr = self.repo.create_pull_request(
+            pr = repo.create_pull_request(
                 title=f"🔧 Bug Analysis: {issue.title}",
                 body=pr_body,
                 head=new_branch,
@@ -607,6 +864,44 @@ Provide the corrected code with clear explanations
             return None
 
 
+def run_batch_analysis(surgeon: BugSurgeon, issue_numbers: List[int]):
+    """Analyze several GitHub issues in a single Message Batches submission"""
+    if not surgeon.repo:
+        logger.error("Batch mode requires GITHUB_TOKEN and GITHUB_REPOSITORY")
+        sys.exit(1)
+
+    if not issue_numbers:
+        logger.error("Batch mode requires ISSUE_NUMBER (comma-separated)")
+        sys.exit(1)
+
+    issues = {}
+    batch = []
+    for number in issue_numbers:
+        issue = surgeon.repo.get_issue(number)
+        issue_body = f"Title: {issue.title}\n\nDescription:\n{issue.body}"
+        issues[number] = issue
+        batch.append((number, issue_body, surgeon._extract_file_paths(issue_body)))
+
+    results = surgeon.analyze_bugs_batch(batch)
+
+    failed = []
+    for number, analysis in results.items():
+        if not analysis:
+            failed.append(number)
+            continue
+
+        print(f"\n#{number} 🔍 Root Cause: {analysis.root_cause}")
+        print(f"#{number} 📊 Confidence: {analysis.confidence}")
+
+        pr_url = surgeon.create_analysis_pr(issues[number], analysis)
+        if pr_url:
+            print(f"#{number} 📋 Created PR: {pr_url}")
+
+    if failed:
+        logger.error(f"Batch analysis failed for issues: {failed}")
+        sys.exit(1)
+
+
 def main():
     """Main entry point for GitHub Actions and local testing"""
     # Load environment variables from .env file
@@ -621,6 +916,14 @@ def main():
         issue_number = os.getenv('ISSUE_NUMBER')
         issue_body = os.getenv('ISSUE_BODY')
 
+        # Several issues (or an explicit request) go through the Batches API
+        issue_numbers = [n.strip() for n in (issue_number or '').split(',') if n.strip()]
+        batch_mode = os.getenv('BATCH_MODE', '').lower() in ('1', 'true', 'yes') or '--batch' in sys.argv
+        if batch_mode or len(issue_numbers) > 1:
+            run_batch_analysis(surgeon, [int(n) for n in issue_numbers])
+            logger.info("Bug Surgeon batch run completed successfully")
+            return
+
         if not issue_body:
             # For local testing - prompt for input
             if not issue_number:
@@ -687,8 +990,7 @@ The authenticate_user function in examples/auth.py is throwing this error on lin
 
         if analysis.reasoning_trace:
             print(f"\n🧠 Reasoning Steps:")
-            for i, trace in enumerate(analysis.reasoning_trace, 1):
-                print(f"   {i}. {trace[:100]}...")
+            print("\n".join(f"   {i}. {trace[:100]}..." for i, trace in enumerate(analysis.reasoning_trace, 1)))
 
         # Create PR if in GitHub Actions mode
         if surgeon.repo and issue_number:
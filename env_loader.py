@@ -0,0 +1,37 @@
+"""
+Shared .env loader for the Bug Surgeon helper scripts
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict
+
+# KEY=value lines of a .env file; values may be quoted or carry a " # comment".
+# Keep in sync with debug_orchestrator._ENV_RE, which stays a standalone copy so
+# that module can still be deployed as a single file.
+_ENV_RE = re.compile(
+    rb'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    rb'(?:"([^"\n]*)"|\'([^\'\n]*)\'|([^\n]*?))'
+    rb'[ \t\r]*(?:[ \t]#[^\n]*)?$',
+    re.MULTILINE
+)
+
+
+def load_env_file(path='.env', skip_empty: bool = False) -> Dict[str, str]:
+    """Load environment variables from a .env file and return the ones loaded"""
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return {}
+
+    # Scan the raw bytes; only the matched keys and values get decoded
+    parsed = {}
+    for match in _ENV_RE.finditer(data):
+        key, double_quoted, single_quoted, bare = match.groups()
+        value = double_quoted or single_quoted or bare or b''
+        # skip_empty keeps a blank KEY= line from wiping a variable set in the shell
+        if value or not skip_empty:
+            parsed[key.decode('utf-8')] = value.decode('utf-8')
+    os.environ.update(parsed)
+    return parsed
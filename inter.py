@@ -3,21 +3,31 @@
 Simple interactive test to verify the Bug Surgeon works
 """
 
-import os
 import sys
 from pathlib import Path
 
+from env_loader import load_env_file
 
-def load_env_file():
-    """Load environment variables from .env file"""
-    env_path = Path('.env')
-    if env_path.exists():
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip().strip('"').strip("'")
+# Demo bug report pointing at examples/auth.py
+_DEMO_BUG_DESCRIPTION = """
+I'm getting this error in my Python authentication module:
+
+```
+Traceback (most recent call last):
+  File "examples/auth.py", line 42, in authenticate_user
+    return user.id
+AttributeError: 'NoneType' object has no attribute 'id'
+```
+
+Context:
+- This error happens when users try to log in
+- It was working fine before our latest deployment  
+- Multiple users are reporting they can't access their accounts
+- The error occurs after entering valid credentials
+- Our user database and sessions table seem normal
+
+The authenticate_user function in examples/auth.py is throwing this error on line 42.
+"""
 
 
 def main():
@@ -49,25 +59,7 @@ def main():
 
     if choice == '1':
         # Demo bug using existing auth.py file
-        bug_description = """
-I'm getting this error in my Python authentication module:
-
-```
-Traceback (most recent call last):
-  File "examples/auth.py", line 42, in authenticate_user
-    return user.id
-AttributeError: 'NoneType' object has no attribute 'id'
-```
-
-Context:
-- This error happens when users try to log in
-- It was working fine before our latest deployment  
-- Multiple users are reporting they can't access their accounts
-- The error occurs after entering valid credentials
-- Our user database and sessions table seem normal
-
-The authenticate_user function in examples/auth.py is throwing this error on line 42.
-"""
+        bug_description = _DEMO_BUG_DESCRIPTION
         print("🔍 Using demo bug report...")
 
     else:
@@ -91,9 +83,9 @@ The authenticate_user function in examples/auth.py is throwing this error on lin
 
     try:
         # Import and run the bug surgeon
-        from debug_orchestrator import BugSurgeon
+        from _get_surgeon import get_surgeon
 
-        surgeon = BugSurgeon()
+        surgeon = get_surgeon()
         analysis = surgeon.analyze_bug(bug_description)
 
         if analysis:
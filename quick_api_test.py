@@ -4,19 +4,8 @@ Quick API format test to verify Anthropic API is working
 """
 
 import os
-from pathlib import Path
 
-
-def load_env_file():
-    """Load environment variables from .env file"""
-    env_path = Path('.env')
-    if env_path.exists():
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip().strip('"').strip("'")
+from env_loader import load_env_file
 
 
 def test_api_call():
@@ -29,9 +18,9 @@ def test_api_call():
         return False
 
     try:
-        from anthropic import Anthropic
+        from api_client import get_anthropic
 
-        client = Anthropic(api_key=api_key)
+        client = get_anthropic()
 
         # Test the correct API format
         response = client.messages.create(
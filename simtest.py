@@ -3,19 +3,20 @@
 Simple direct test - provide file content upfront to avoid loop
 """
 
-import os
 from pathlib import Path
 
+from env_loader import load_env_file
 
-def load_env_file():
-    env_path = Path('.env')
-    if env_path.exists():
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip().strip('"').strip("'")
+
+def _extract(text, tag):
+    """Return the stripped body of the first <tag>...</tag> block, or None"""
+    start = text.find(f'<{tag}>')
+    if start < 0:
+        return None
+    end = text.find(f'</{tag}>', start)
+    if end < 0:
+        return None
+    return text[start + len(tag) + 2:end].strip()
 
 
 def simple_direct_test():
@@ -29,13 +30,12 @@ def simple_direct_test():
         print("❌ examples/auth.py not found")
         return False
 
-    file_content = auth_file.read_text()
+    file_content = auth_file.read_text(encoding='utf-8')
 
     try:
-        from anthropic import Anthropic
+        from api_client import get_anthropic
 
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        client = Anthropic(api_key=api_key)
+        client = get_anthropic()
 
         # Create comprehensive prompt with file content included
         comprehensive_prompt = f"""
@@ -84,17 +84,19 @@ Provide the corrected code with clear explanations
         # Use working model from previous test
         models_to_try = ["claude-3-haiku-20240307", "claude-3-sonnet-20240229"]
 
+        # Everything but the model is the same for each attempt
+        request_kwargs = dict(
+            max_tokens=4096,
+            system="You are a Senior Debugging Specialist. Analyze code systematically to find root causes.",
+            messages=[
+                {"role": "user", "content": comprehensive_prompt}
+            ],
+            temperature=0.1
+        )
+
         for model in models_to_try:
             try:
-                response = client.messages.create(
-                    model=model,
-                    max_tokens=4096,
-                    system="You are a Senior Debugging Specialist. Analyze code systematically to find root causes.",
-                    messages=[
-                        {"role": "user", "content": comprehensive_prompt}
-                    ],
-                    temperature=0.1
-                )
+                response = client.messages.create(model=model, **request_kwargs)
 
                 response_text = response.content[0].text
                 print(f"✅ Using model: {model}")
@@ -107,16 +109,14 @@ Provide the corrected code with clear explanations
             print("❌ No working models found")
             return False
 
-        print(f"\n📄 Response length: {len(response_text)} chars")
+        response_len = len(response_text)
+        print(f"\n📄 Response length: {response_len} chars")
 
         # Extract analysis
-        import re
-        analysis_match = re.search(r'<analysis>(.*?)</analysis>', response_text, re.DOTALL)
-        solution_match = re.search(r'<solution>(.*?)</solution>', response_text, re.DOTALL)
-
-        if analysis_match:
-            analysis_text = analysis_match.group(1).strip()
+        analysis_text = _extract(response_text, 'analysis')
+        solution_text = _extract(response_text, 'solution')
 
+        if analysis_text is not None:
             print("\n🎉 SUCCESSFUL BUG ANALYSIS")
             print("=" * 50)
 
@@ -130,17 +130,17 @@ Provide the corrected code with clear explanations
                 elif line.startswith('CONFIDENCE:'):
                     print(f"📊 Confidence: {line.split(':', 1)[1].strip()}")
 
-            if solution_match:
-                solution_text = solution_match.group(1).strip()
+            if solution_text is not None:
                 print(f"\n🔧 Solution:")
-                print(f"   {solution_text[:200]}..." if len(solution_text) > 200 else f"   {solution_text}")
+                solution_len = len(solution_text)
+                print(f"   {solution_text[:200]}..." if solution_len > 200 else f"   {solution_text}")
 
             print("\n✅ SUCCESS: Direct analysis worked perfectly!")
             print("🎯 The Bug Surgeon correctly analyzed the race condition bug!")
             return True
         else:
             print("\n⚠️  Analysis found but no structured format:")
-            print(response_text[:500] + "..." if len(response_text) > 500 else response_text)
+            print(response_text[:500] + "..." if response_len > 500 else response_text)
             return False
 
     except Exception as e:
@@ -11,16 +11,13 @@ from pathlib import Path
 # Add the parent directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
+_REQUIRED_VARS = ('ANTHROPIC_API_KEY', 'GITHUB_TOKEN', 'GITHUB_REPOSITORY')
+
 def test_github_integration():
     """Test GitHub integration"""
 
     # Check environment variables
-    required_vars = ['ANTHROPIC_API_KEY', 'GITHUB_TOKEN', 'GITHUB_REPOSITORY']
-    missing_vars = []
-
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    missing_vars = [var for var in _REQUIRED_VARS if not os.environ.get(var)]
 
     if missing_vars:
         print("❌ Missing environment variables:")
@@ -30,8 +27,8 @@ def test_github_integration():
         return False
 
     try:
-        from debug_orchestrator import BugSurgeon
-        surgeon = BugSurgeon()
+        from _get_surgeon import get_surgeon
+        surgeon = get_surgeon()
         print("✅ BugSurgeon with GitHub integration initialized")
 
         if surgeon.repo:
@@ -6,12 +6,62 @@ Tests all core functionality with proper environment loading
 
 import os
 import sys
-import traceback
 from pathlib import Path
 
 # Add the parent directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
+import env_loader
+
+# Values left in .env by the template rather than a real key
+_PLACEHOLDER_KEYS = frozenset({"your_anthropic_api_key_here", "your_key_here", ""})
+_API_KEY_PREFIX = 'sk-ant-api'
+
+# Fix-up hints shown in the final summary, keyed by failed test name
+_HELP_MESSAGES = {
+    "env_loading": (
+        "\n🔧 To fix environment loading:\n"
+        "   cp .env.template .env\n"
+        "   # Edit .env and add your ANTHROPIC_API_KEY"
+    ),
+    "api_key": (
+        "\n🔧 To fix API key:\n"
+        "   Get your key from: https://console.anthropic.com/\n"
+        "   Add to .env: ANTHROPIC_API_KEY=sk-ant-api03-your-key"
+    ),
+}
+
+# Comprehensive test bug report
+_TEST_BUG_REPORT = """
+I'm getting this error in my Python Flask web application:
+
+Error Traceback:
+```
+Traceback (most recent call last):
+  File "/app/auth.py", line 42, in authenticate_user
+    return user.id
+AttributeError: 'NoneType' object has no attribute 'id'
+```
+
+Context:
+- This error happens when users try to log in to our web app
+- It was working perfectly fine yesterday
+- Multiple users are reporting they can't access their accounts
+- The error occurs after entering valid credentials
+- Our user database seems fine, sessions table also looks normal
+
+Additional Details:
+- Flask app running on Python 3.9
+- Using SQLAlchemy for database ORM
+- PostgreSQL database backend
+- This is a critical production issue affecting all users
+
+Expected Behavior: Users should be able to log in successfully
+Actual Behavior: Getting 500 error with AttributeError on 'NoneType'
+
+Please help identify the root cause and provide a fix.
+"""
+
 
 def load_env_file():
     """Load environment variables from .env file"""
@@ -25,34 +75,19 @@ def load_env_file():
         template_path = Path('.env.template')
         if template_path.exists():
             try:
-                import shutil
-                shutil.copy('.env.template', '.env')
+                env_path.write_bytes(template_path.read_bytes())
                 print("✅ Created .env from template")
                 print("📝 Please edit .env and add your ANTHROPIC_API_KEY")
                 return False
-            except Exception as e:
+            except OSError as e:
                 print(f"❌ Could not copy template: {e}")
 
         print("Please create .env file manually or run: cp .env.template .env")
         return False
 
     # Load environment variables
-    loaded_vars = []
     try:
-        with open(env_path, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    try:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip().strip('"').strip("'")  # Remove quotes
-
-                        if key and value:
-                            os.environ[key] = value
-                            loaded_vars.append(key)
-                    except Exception as e:
-                        print(f"⚠️  Warning: Could not parse line {line_num}: {line}")
+        loaded_vars = list(env_loader.load_env_file(env_path, skip_empty=True))
 
         if loaded_vars:
             print(f"✅ Loaded {len(loaded_vars)} environment variables from .env file")
@@ -71,19 +106,20 @@ def check_dependencies():
     """Check if all required dependencies are installed"""
     print("\n🔍 Checking dependencies...")
 
+    # find_spec locates the packages without executing their (heavy) imports
+    from importlib.util import find_spec
+
     missing_deps = []
 
-    try:
-        import anthropic
-        print("✅ anthropic library found")
-    except ImportError:
+    if find_spec('anthropic') is None:
         missing_deps.append("anthropic")
+    else:
+        print("✅ anthropic library found")
 
-    try:
-        import github
-        print("✅ PyGithub library found")
-    except ImportError:
+    if find_spec('github') is None:
         missing_deps.append("PyGithub")
+    else:
+        print("✅ PyGithub library found")
 
     if missing_deps:
         print(f"❌ Missing dependencies: {', '.join(missing_deps)}")
@@ -109,14 +145,14 @@ def test_api_key():
         print("3. Get your key from: https://console.anthropic.com/")
         return False
 
-    if api_key in ["your_anthropic_api_key_here", "your_key_here", ""]:
+    if api_key in _PLACEHOLDER_KEYS:
         print("❌ API key is still placeholder value")
         print("Please edit .env and add your real API key from https://console.anthropic.com/")
         return False
 
-    if not api_key.startswith('sk-ant-api'):
+    if not api_key.startswith(_API_KEY_PREFIX):
         print("❌ API key format looks incorrect")
-        print("Anthropic API keys should start with 'sk-ant-api'")
+        print(f"Anthropic API keys should start with '{_API_KEY_PREFIX}'")
         print("Double-check your key from https://console.anthropic.com/")
         return False
 
@@ -142,6 +178,7 @@ def test_bug_surgeon_import():
         return None
     except Exception as e:
         print(f"❌ Unexpected error importing BugSurgeon: {e}")
+        import traceback
         traceback.print_exc()
         return None
 
@@ -151,7 +188,9 @@ def test_bug_surgeon_initialization(BugSurgeon):
     print("\n🚀 Testing BugSurgeon initialization...")
 
     try:
-        # Set GitHub env vars to None to avoid GitHub requirement
+        # Set GitHub env vars to None to avoid GitHub requirement; GITHUB_TOKENS
+        # takes priority over GITHUB_TOKEN, so clear it as well
+        os.environ.pop('GITHUB_TOKENS', None)
         os.environ['GITHUB_TOKEN'] = 'dummy_token_for_local_test'
         surgeon = BugSurgeon()
         print("✅ BugSurgeon initialized successfully")
@@ -164,6 +203,7 @@ def test_bug_surgeon_initialization(BugSurgeon):
             print("❌ GitHub token error - this is expected for local testing")
             print("Setting dummy GitHub token for local test...")
             try:
+                os.environ.pop('GITHUB_TOKENS', None)
                 os.environ['GITHUB_TOKEN'] = 'dummy_token_for_local_test'
                 surgeon = BugSurgeon()
                 print("✅ BugSurgeon initialized with dummy GitHub token")
@@ -176,6 +216,7 @@ def test_bug_surgeon_initialization(BugSurgeon):
             return None
     except Exception as e:
         print(f"❌ Unexpected initialization error: {e}")
+        import traceback
         traceback.print_exc()
         return None
 
@@ -184,83 +225,34 @@ def test_bug_analysis(surgeon):
     """Test the actual bug analysis functionality"""
     print("\n🔍 Testing bug analysis...")
 
-    # Comprehensive test bug report
-    test_bug = """
-I'm getting this error in my Python Flask web application:
-
-Error Traceback:
-```
-Traceback (most recent call last):
-  File "/app/auth.py", line 42, in authenticate_user
-    return user.id
-AttributeError: 'NoneType' object has no attribute 'id'
-```
-
-Context:
-- This error happens when users try to log in to our web app
-- It was working perfectly fine yesterday
-- Multiple users are reporting they can't access their accounts
-- The error occurs after entering valid credentials
-- Our user database seems fine, sessions table also looks normal
-
-Additional Details:
-- Flask app running on Python 3.9
-- Using SQLAlchemy for database ORM
-- PostgreSQL database backend
-- This is a critical production issue affecting all users
-
-Expected Behavior: Users should be able to log in successfully
-Actual Behavior: Getting 500 error with AttributeError on 'NoneType'
-
-Please help identify the root cause and provide a fix.
-"""
-
     try:
         print("📋 Analyzing comprehensive bug report...")
         print("   Bug type: Authentication error")
         print("   Error: AttributeError on NoneType")
         print("   Context: Production Flask app")
 
-        analysis = surgeon.analyze_bug(test_bug)
+        analysis = surgeon.analyze_bug(_TEST_BUG_REPORT)
 
         if analysis:
-            print("\n" + "=" * 60)
-            print("🎉 BUG ANALYSIS RESULTS")
-            print("=" * 60)
-
-            print(f"\n🔍 Root Cause:")
-            print(f"   {analysis.root_cause}")
-
-            print(f"\n📊 Confidence Level:")
-            print(f"   {analysis.confidence}")
-
-            print(f"\n📝 Detailed Explanation:")
-            explanation = analysis.explanation
-            # Wrap long explanations
-            if len(explanation) > 100:
-                words = explanation.split()
-                lines = []
-                current_line = ""
-                for word in words:
-                    if len(current_line + word) < 80:
-                        current_line += word + " "
-                    else:
-                        lines.append(current_line.strip())
-                        current_line = word + " "
-                if current_line:
-                    lines.append(current_line.strip())
-                for line in lines:
-                    print(f"   {line}")
-            else:
-                print(f"   {explanation}")
-
-            print(f"\n🧠 Reasoning Steps:")
-            for i, trace in enumerate(analysis.reasoning_trace, 1):
-                trace_preview = trace[:100] + "..." if len(trace) > 100 else trace
-                print(f"   {i}. {trace_preview}")
-
-            print("\n✅ Bug analysis completed successfully!")
-            print("🎯 The Bug Surgeon is working perfectly!")
+            import textwrap
+            root_cause, confidence, explanation, traces = (
+                analysis.root_cause, analysis.confidence, analysis.explanation, analysis.reasoning_trace
+            )
+            out = [
+                "", "=" * 60, "🎉 BUG ANALYSIS RESULTS", "=" * 60,
+                "\n🔍 Root Cause:", f"   {root_cause}",
+                "\n📊 Confidence Level:", f"   {confidence}",
+                "\n📝 Detailed Explanation:",
+            ]
+            out += [f"   {line}" for line in textwrap.wrap(explanation, width=80)]
+
+            out.append(f"\n🧠 Reasoning Steps ({len(traces)}):")
+            for i, trace in enumerate(traces, 1):
+                trace_preview = textwrap.shorten(trace, width=103, placeholder='...')
+                out.append(f"   {i}. {trace_preview}")
+
+            out += ["\n✅ Bug analysis completed successfully!", "🎯 The Bug Surgeon is working perfectly!"]
+            sys.stdout.write("\n".join(out) + "\n")
             return True
         else:
             print("❌ Analysis failed - no results returned")
@@ -289,6 +281,7 @@ Please help identify the root cause and provide a fix.
             print("   - Try again in a moment")
         else:
             print("💡 Unexpected error - full traceback:")
+            import traceback
             traceback.print_exc()
 
         return False
@@ -345,44 +338,40 @@ def run_comprehensive_test():
 
 def print_final_results(test_results):
     """Print final test results and next steps"""
-    print("\n" + "=" * 60)
-    print("📊 FINAL TEST RESULTS")
-    print("=" * 60)
-
     total_tests = len(test_results)
     passed_tests = sum(test_results.values())
 
+    # Build the whole report first and write it in one go
+    out = ["", "=" * 60, "📊 FINAL TEST RESULTS", "=" * 60]
+
     for test_name, result in test_results.items():
         status = "✅ PASSED" if result else "❌ FAILED"
         test_display = test_name.replace("_", " ").title()
-        print(f"{test_display:20} {status}")
-
-    print(f"\nOverall: {passed_tests}/{total_tests} tests passed")
-
-    if passed_tests == total_tests:
-        print("\n🎉 ALL TESTS PASSED!")
-        print("🎯 Your Bug Surgeon is fully functional and ready for production!")
-        print("\n🚀 Next Steps:")
-        print("1. Test with your own bug descriptions")
-        print("2. Set up GitHub integration: python test_github.py")
-        print("3. Deploy to GitHub Actions")
-        print("4. Update your article with these working code examples!")
-        return True
+        out.append(f"{test_display:20} {status}")
+
+    out.append(f"\nOverall: {passed_tests}/{total_tests} tests passed")
+
+    success = passed_tests == total_tests
+    if success:
+        out += [
+            "\n🎉 ALL TESTS PASSED!",
+            "🎯 Your Bug Surgeon is fully functional and ready for production!",
+            "\n🚀 Next Steps:",
+            "1. Test with your own bug descriptions",
+            "2. Set up GitHub integration: python test_github.py",
+            "3. Deploy to GitHub Actions",
+            "4. Update your article with these working code examples!",
+        ]
     else:
-        print(f"\n⚠️  {total_tests - passed_tests} test(s) failed")
-        print("💡 Fix the failed tests above before proceeding")
-
-        if not test_results["env_loading"]:
-            print("\n🔧 To fix environment loading:")
-            print("   cp .env.template .env")
-            print("   # Edit .env and add your ANTHROPIC_API_KEY")
+        out += [
+            f"\n⚠️  {total_tests - passed_tests} test(s) failed",
+            "💡 Fix the failed tests above before proceeding",
+        ]
+        out += [_HELP_MESSAGES[name] for name, passed in test_results.items()
+                if not passed and name in _HELP_MESSAGES]
 
-        if not test_results["api_key"]:
-            print("\n🔧 To fix API key:")
-            print("   Get your key from: https://console.anthropic.com/")
-            print("   Add to .env: ANTHROPIC_API_KEY=sk-ant-api03-your-key")
-
-        return False
+    sys.stdout.write("\n".join(out) + "\n")
+    return success
 
 
 if __name__ == "__main__":
@@ -395,5 +384,6 @@ if __name__ == "__main__":
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Unexpected error during testing: {e}")
+        import traceback
         traceback.print_exc()
         sys.exit(1)
\ No newline at end of file